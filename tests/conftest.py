@@ -1,36 +1,109 @@
+# pylint: disable=redefined-outer-name
+import itertools
 import os
 
 import allure
 import pytest
 from playwright import sync_playwright
 
+CI_BROWSER_ARGS = [
+    '--no-sandbox',
+    '--disable-dev-shm-usage',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-extensions',
+    '--disable-component-update',
+    '--disable-default-apps',
+    '--mute-audio',
+    '--no-first-run',
+    '--disable-features=TranslateUI,BackForwardCache',
+]
+
+HEADLESS_VIEWPORT = {'width': 1920, 'height': 1080}
+_PAGE_KEY = pytest.StashKey()
+
+
+def pytest_addoption(parser):
+    parser.addoption('--max-screenshots', type=int, default=200,
+                     help='Max amount of failure screenshots attached to the report per process')
+
+
+def pytest_configure(config):
+    config.headless = bool(os.getenv('DOCKER_RUN') or os.getenv('GITHUB_RUN'))
+    config.screenshot_counter = itertools.count()
+
 
 @pytest.fixture(scope='session')
-def page():
+def headless(request):
+    return request.config.headless
+
+
+@pytest.fixture(scope='session')
+def browser(headless):
     with sync_playwright() as play:
-        if os.getenv('DOCKER_RUN') or os.getenv('GITHUB_RUN'):
-            browser = play.chromium.launch(headless=True, args=['--no-sandbox'])
+        if headless:
+            launched = play.chromium.launch(headless=True, args=CI_BROWSER_ARGS, chromiumSandbox=False)
         else:
-            browser = play.chromium.launch(headless=False)
-        page = browser.newPage()
-        global PAGE
-        PAGE = page
-        yield page
-        browser.close()
+            launched = play.chromium.launch(headless=False)
+        yield launched
+        launched.close()
+
+
+def _new_context(browser, headless):
+    return browser.newContext(viewport=HEADLESS_VIEWPORT) if headless else browser.newContext()
+
+
+@pytest.fixture(scope='session')
+def browser_context(browser, headless):
+    context = _new_context(browser, headless)
+    yield context
+    context.close()
+
+
+@pytest.fixture(scope='session')
+def session_page(browser_context):
+    new_page = browser_context.newPage()
+    yield new_page
+    new_page.close()
+
+
+@pytest.fixture
+def page(request, browser_context):
+    new_page = browser_context.newPage()
+    request.node.stash[_PAGE_KEY] = new_page
+    yield new_page
+    new_page.close()
+
+
+@pytest.fixture
+def isolated_context(browser, headless):
+    context = _new_context(browser, headless)
+    yield context
+    context.close()
+
+
+@pytest.fixture
+def isolated_page(request, isolated_context):
+    new_page = isolated_context.newPage()
+    request.node.stash[_PAGE_KEY] = new_page
+    yield new_page
+    new_page.close()
 
 
-PAGE = None
+def _screenshot_allowed(config):
+    return next(config.screenshot_counter) < config.getoption('max_screenshots')
 
 
-@pytest.hookimpl(tryfirst=True, hookwrapper=True)
-def pytest_runtest_makereport():
-    outcome = yield
-    test_result = outcome.get_result()
+@pytest.hookimpl(tryfirst=True, wrapper=True)
+def pytest_runtest_makereport(item):
+    test_result = yield
+    if test_result.passed or test_result.when == 'teardown':
+        return test_result
 
-    if test_result.when in ["setup", "call"]:
-        xfail = hasattr(test_result, 'wasxfail')
-        if test_result.failed or (test_result.skipped and xfail):
-            global PAGE
-            if PAGE:
-                allure.attach(PAGE.screenshot(), name='screenshot', attachment_type=allure.attachment_type.PNG)
-                allure.attach(PAGE.content(), name='html_source', attachment_type=allure.attachment_type.HTML)
+    if test_result.failed or hasattr(test_result, 'wasxfail'):
+        failed_page = item.stash.get(_PAGE_KEY, None) or item.funcargs.get('session_page')
+        if failed_page and _screenshot_allowed(item.config):
+            allure.attach(failed_page.screenshot(), name='screenshot', attachment_type=allure.attachment_type.PNG)
+            allure.attach(failed_page.content(), name='html_source', attachment_type=allure.attachment_type.HTML)
+    return test_result